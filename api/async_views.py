@@ -0,0 +1,46 @@
+"""
+Async base view shared by the W-2 API and the mock third-party API
+
+Kept apart from api.views so importing it doesn't pull in the extractor.
+"""
+import asyncio
+
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView that awaits coroutine handlers.
+
+    DRF's dispatch() is sync and would return the unawaited coroutine from
+    an `async def` handler. This runs the same steps but awaits the handler,
+    so under ASGI the request stays on the event loop end to end.
+    """
+    # DRF's own options() is sync, so Django's all-sync-or-all-async check
+    # would reject the class - dispatch handles both kinds below
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
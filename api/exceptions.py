@@ -20,6 +20,13 @@ class W2ProcessingException(APIException):
         super().__init__(detail=detail, code=code)
         self.field = field
 
+        # response body, built once here instead of in the handler. The
+        # public code is the class's default_code, same as for other errors.
+        error = {"code": self.default_code, "message": str(self.detail)}
+        if field:
+            error["details"] = {"field": field}
+        self.error_body = {"success": False, "error": error}
+
 
 class InvalidFileException(W2ProcessingException):
     """Uploaded file is invalid or not a PDF"""
@@ -76,17 +83,16 @@ def custom_exception_handler(exc, context):
     response = exception_handler(exc, context)
 
     if response is not None:
-        error_response = {
-            "success": False,
-            "error": {
-                "code": getattr(exc, "default_code", "error"),
-                "message": str(exc.detail) if hasattr(exc, "detail") else str(exc),
-            },
-        }
-
-        # include field info if available
-        if hasattr(exc, "field") and exc.field:
-            error_response["error"]["details"] = {"field": exc.field}
+        error_response = getattr(exc, "error_body", None)
+        if error_response is None:
+            # DRF / Django errors (405, parse errors, ...)
+            error_response = {
+                "success": False,
+                "error": {
+                    "code": getattr(exc, "default_code", "error"),
+                    "message": str(exc.detail) if hasattr(exc, "detail") else str(exc),
+                },
+            }
 
         logger.error(f"API Error: {error_response['error']['code']} - {error_response['error']['message']}")
         response.data = error_response
@@ -1,8 +1,70 @@
 """
 Serializers for W-2 API
 """
+import io
+
 from rest_framework import serializers
 
+from .exceptions import InvalidFileException
+
+PDF_MAGIC = b"%PDF"
+
+
+def _peek_header(upload, size):
+    """Read the first bytes of an upload without moving its position"""
+    raw = getattr(upload, "file", upload)
+
+    # in-memory upload: slice the buffer directly
+    if isinstance(raw, io.BytesIO):
+        with raw.getbuffer() as buf:
+            return bytes(buf[:size])
+
+    # temp file upload: peek the read buffer, no rewind needed
+    if hasattr(raw, "peek") and raw.tell() == 0:
+        return raw.peek(size)[:size]
+
+    upload.seek(0)
+    header = upload.read(size)
+    upload.seek(0)
+    return header
+
+
+def _upload_error(value):
+    """Return why an upload isn't an acceptable W-2 PDF, or None"""
+    # check size (10MB max)
+    max_size = 10 * 1024 * 1024
+    if value.size > max_size:
+        return f"File size ({value.size / 1024 / 1024:.2f}MB) exceeds max ({max_size / 1024 / 1024}MB)."
+    if not value.size:
+        return "The submitted file is empty."
+
+    # check extension
+    if not value.name.lower().endswith(".pdf"):
+        return f"Only PDF files are accepted. Got: {value.name.split('.')[-1]}"
+
+    # check content type (if provided)
+    content_type = getattr(value, "content_type", "")
+    if content_type and content_type not in ["application/pdf", "application/x-pdf"]:
+        return f"Invalid content type: {content_type}"
+
+    # check PDF magic bytes
+    if _peek_header(value, len(PDF_MAGIC)) != PDF_MAGIC:
+        return "File doesn't appear to be a valid PDF (missing %PDF header)."
+
+    return None
+
+
+def validate_upload(value):
+    """
+    Validate a W-2 upload straight from request.FILES.
+
+    Same checks as W2UploadSerializer without DRF's field binding - the
+    process view calls this on every request.
+    """
+    error = "No file was submitted." if value is None else _upload_error(value)
+    if error:
+        raise InvalidFileException(detail=error, code="file_validation_failed")
+
 
 class W2UploadSerializer(serializers.Serializer):
     """Validates W-2 PDF uploads"""
@@ -10,34 +72,9 @@ class W2UploadSerializer(serializers.Serializer):
     file = serializers.FileField(required=True)
 
     def validate_file(self, value):
-        # check size (10MB max)
-        max_size = 10 * 1024 * 1024
-        if value.size > max_size:
-            raise serializers.ValidationError(
-                f"File size ({value.size / 1024 / 1024:.2f}MB) exceeds max ({max_size / 1024 / 1024}MB)."
-            )
-
-        # check extension
-        if not value.name.lower().endswith(".pdf"):
-            raise serializers.ValidationError(
-                f"Only PDF files are accepted. Got: {value.name.split('.')[-1]}"
-            )
-
-        # check content type (if provided)
-        content_type = getattr(value, "content_type", "")
-        if content_type and content_type not in ["application/pdf", "application/x-pdf"]:
-            raise serializers.ValidationError(f"Invalid content type: {content_type}")
-
-        # check PDF magic bytes
-        value.seek(0)
-        header = value.read(8)
-        value.seek(0)
-
-        if not header.startswith(b"%PDF"):
-            raise serializers.ValidationError(
-                "File doesn't appear to be a valid PDF (missing %PDF header)."
-            )
-
+        error = _upload_error(value)
+        if error:
+            raise serializers.ValidationError(error)
         return value
 
 
@@ -3,18 +3,58 @@ PDF extraction for W-2 forms
 
 Extracts: EIN, SSN, Wages (Box 1), Federal Tax Withheld (Box 2)
 """
+import asyncio
+import hashlib
 import io
 import logging
+import multiprocessing
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 
 import fitz  # pymupdf
+from django.conf import settings
 
 from api.exceptions import DataExtractionException, PDFParsingException
 
 logger = logging.getLogger(__name__)
 
+_DASH_DEL = str.maketrans("", "", "-")
+
+# scan results by content digest (LRU, per process)
+_EXTRACT_CACHE = OrderedDict()
+_EXTRACT_CACHE_MAX = 128
+# extract() may run on several threads (async_to_sync, threaded WSGI)
+_EXTRACT_CACHE_LOCK = threading.Lock()
+
+
+def _label_branches(labels):
+    """
+    Build the lookahead branches for every label variant.
+
+    Variants sharing a leading literal (all the "box X" forms, the two
+    "employer ..." forms) go under one branch, so the prefix is tested once
+    per position instead of once per variant.
+    """
+    grouped = {}
+    for key, patterns in labels.items():
+        for i, pattern in enumerate(patterns):
+            # stop before a char that has a quantifier on it ("employees?")
+            prefix = re.match(r"[a-z0-9]*(?![?*+{])", pattern).group()
+            grouped.setdefault(prefix, []).append((f"{key}_{i}", pattern[len(prefix):]))
+
+    branches = []
+    for prefix, variants in grouped.items():
+        alternatives = "|".join(f"(?P<{name}>{rest})" for name, rest in variants)
+        branches.append(f"(?={prefix}(?:{alternatives}))")
+    return branches
+
 
 @dataclass
 class W2ExtractedData:
@@ -43,73 +83,138 @@ class W2DataExtractor:
     3. Heuristics to filter out false positives
     """
 
-    # regex patterns
-    EIN_PATTERN = re.compile(r"\b(\d{2}[-]?\d{7})\b")
-    SSN_PATTERN = re.compile(r"\b(\d{3}[-]?\d{2}[-]?\d{4})\b")
-    CURRENCY_PATTERN = re.compile(r"\$?\s*([\d,]+\.?\d{0,2})")
+    # value patterns; SSN goes first so a bare 9-digit run is tagged once and
+    # classified in Python (it's a candidate for both SSN and EIN)
+    VALUE_PATTERNS = {
+        "ssn": r"\b(?P<ssn>\d{3}-?\d{2}-?\d{4})\b",
+        "ein": r"\b(?P<ein>\d{2}-?\d{7})\b",
+        "money": r"(?:\$\s*)?(?P<money>\d[\d,]*(?:\.\d{1,2})?)",
+    }
 
-    # label patterns for finding fields
+    # label patterns for finding fields, in priority order. Lowercase only -
+    # they run against lowered text, so no IGNORECASE in the scanner
     LABELS = {
         "wages": [
-            r"(?i)wages[,\s]+tips[,\s]+other\s+comp",
-            r"(?i)box\s*1\b",
-            r"(?i)1\s+wages",
+            r"wages[,\s]+tips[,\s]+other\s+comp",
+            r"box\s*1\b",
+            r"1\s+wages",
         ],
         "fed_tax": [
-            r"(?i)federal\s+income\s+tax\s+withheld",
-            r"(?i)box\s*2\b",
-            r"(?i)2\s+federal",
+            r"federal\s+income\s+tax\s+withheld",
+            r"box\s*2\b",
+            r"2\s+federal",
         ],
         "ein": [
-            r"(?i)employer.*identification.*number",
-            r"(?i)employer'?s?\s+EIN",
-            r"(?i)box\s*b\b",
+            # bounded gaps - ".*" twice is quadratic on long single-line pages
+            r"employer'?s?\W{1,10}identification\W{1,10}number",
+            r"employer'?s?\s+ein",
+            r"box\s*b\b",
         ],
         "ssn": [
-            r"(?i)employee'?s?\s+social\s+security",
-            r"(?i)social\s+security\s+number",
-            r"(?i)box\s*a\b",
+            r"employee'?s?\s+social\s+security",
+            r"social\s+security\s+number",
+            r"box\s*a\b",
         ],
     }
 
-    def __init__(self):
-        # pre-compile label patterns
-        self._label_patterns = {
-            key: [re.compile(p) for p in patterns]
-            for key, patterns in self.LABELS.items()
-        }
+    # field -> (value kind, window anchored at label end, window size)
+    WINDOWS = {
+        "wages": ("money", True, 100),
+        "fed_tax": ("money", True, 100),
+        "ein": ("ein", False, 200),
+        "ssn": ("ssn", False, 200),
+    }
 
-    async def extract(self, file_content: bytes) -> W2ExtractedData:
-        """Main extraction method"""
-        text = self._get_text(file_content)
-        return self._parse_text(text)
+    # literal words at least one of a field's labels must contain (lowercase),
+    # checked with a plain substring search before building the scanner
+    LABEL_KEYWORDS = {
+        "wages": ("wages", "box"),
+        "fed_tax": ("federal", "box"),
+        "ein": ("employer", "box"),
+        "ssn": ("social", "box"),
+    }
 
-    def _get_text(self, content: bytes) -> str:
-        """Extract text from PDF using PyMuPDF"""
+    # plain "text" output without ligature glyphs, so "ﬁ" comes out as "fi"
+    # and labels like "identification" still match
+    TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+    async def extract(self, file_content) -> W2ExtractedData:
+        """
+        Main extraction method
+
+        Takes the PDF as bytes or a binary file object. A file is read here,
+        so its bytes only live for the duration of the extraction.
+        """
+        if not isinstance(file_content, (bytes, bytearray)):
+            file_content = await asyncio.to_thread(_read_all, file_content)
+
+        # clients retrying a failed submission resend the same PDF
+        key = hashlib.blake2b(file_content, digest_size=16).digest()
+        with _EXTRACT_CACHE_LOCK:
+            found = _EXTRACT_CACHE.get(key)
+            if found is not None:
+                _EXTRACT_CACHE.move_to_end(key)
+
+        if found is None:
+            # parsing is CPU-bound, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            pool = _get_pool()
+            try:
+                found = await loop.run_in_executor(pool, _scan_worker, file_content)
+            except BrokenProcessPool:
+                # a worker died mid-parse (MuPDF crash, OOM kill) - this
+                # request fails, the next one gets a fresh pool
+                logger.error("PDF worker died, restarting the parse pool")
+                _replace_broken_pool(pool)
+                raise PDFParsingException("Failed to parse PDF: parser crashed", code="pdf_parse_error")
+            with _EXTRACT_CACHE_LOCK:
+                _EXTRACT_CACHE[key] = found
+                if len(_EXTRACT_CACHE) > _EXTRACT_CACHE_MAX:
+                    _EXTRACT_CACHE.popitem(last=False)
+
+        return self._build_result(found)
+
+    def _scan(self, file_content: bytes) -> dict:
+        """Scan the PDF page by page for all fields"""
+        best = dict.fromkeys(self.LABELS)  # key -> (rank, value)
+
+        with closing(self._iter_page_text(file_content)) as pages:
+            for text in pages:
+                for key, hit in self._extract_all(text).items():
+                    # a later page only wins with a better-ranked label, so
+                    # a cover sheet's fallback can't shadow the real form
+                    if hit is not None and (best[key] is None or hit[0] < best[key][0]):
+                        best[key] = hit
+                # W-2 data is almost always on page 1, skip rendering the rest
+                # once nothing later can outrank what we have
+                if all(hit is not None and hit[0] == 0 for hit in best.values()):
+                    break
+
+        return {key: hit[1] if hit else None for key, hit in best.items()}
+
+    def _iter_page_text(self, content: bytes):
+        """Yield text page by page from PDF using PyMuPDF"""
         try:
             doc = fitz.open(stream=content, filetype="pdf")
-            
-            if doc.page_count == 0:
-                doc.close()
-                raise PDFParsingException("PDF has no pages", code="empty_pdf")
-
-            text_parts = []
-            for page in doc:
-                text = page.get_text()
-                if text:
-                    text_parts.append(text)
-            
-            doc.close()
-            full_text = "\n".join(text_parts)
-
-            if not full_text.strip():
-                raise PDFParsingException(
-                    "No extractable text - might be a scanned document",
-                    code="no_text_content",
-                )
-
-            logger.debug(f"Extracted {len(full_text)} chars from PDF")
-            return full_text
+
+            with doc:
+                if doc.page_count == 0:
+                    raise PDFParsingException("PDF has no pages", code="empty_pdf")
+
+                total = 0
+                for page in doc:
+                    text = page.get_text("text", flags=self.TEXT_FLAGS)
+                    if text.strip():
+                        total += len(text)
+                        yield text
+
+                if not total:
+                    raise PDFParsingException(
+                        "No extractable text - might be a scanned document",
+                        code="no_text_content",
+                    )
+
+                logger.debug(f"Extracted {total} chars from PDF")
 
         except PDFParsingException:
             raise
@@ -117,24 +222,17 @@ class W2DataExtractor:
             logger.error(f"PDF parse error: {e}")
             raise PDFParsingException(f"Failed to parse PDF: {e}", code="pdf_parse_error")
 
-    def _parse_text(self, text: str) -> W2ExtractedData:
-        """Parse extracted text to find W-2 fields"""
+    def _build_result(self, found: dict) -> W2ExtractedData:
+        """Check the extracted fields and build the result"""
         errors = []
 
-        ein = self._find_ein(text)
-        if not ein:
+        if not found["ein"]:
             errors.append(("ein", "EIN"))
-
-        ssn = self._find_ssn(text)
-        if not ssn:
+        if not found["ssn"]:
             errors.append(("ssn", "SSN"))
-
-        wages = self._find_currency(text, "wages")
-        if wages is None:
+        if found["wages"] is None:
             errors.append(("wages", "Wages (Box 1)"))
-
-        fed_tax = self._find_currency(text, "fed_tax")
-        if fed_tax is None:
+        if found["fed_tax"] is None:
             errors.append(("federal_tax_withheld", "Federal Tax (Box 2)"))
 
         if errors:
@@ -145,70 +243,124 @@ class W2DataExtractor:
                 field=errors[0][0],
             )
 
-        return W2ExtractedData(ein=ein, ssn=ssn, wages=wages, federal_tax_withheld=fed_tax)
-
-    def _find_ein(self, text: str):
-        """Find EIN in text"""
-        # try finding near labels first
-        for pattern in self._label_patterns["ein"]:
-            match = pattern.search(text)
-            if match:
-                search_area = text[match.start():match.start() + 200]
-                ein_match = self.EIN_PATTERN.search(search_area)
-                if ein_match:
-                    return self._format_ein(ein_match.group(1))
-
-        # fallback: find all EIN-like numbers
-        all_matches = self.EIN_PATTERN.findall(text)
-        for m in all_matches:
-            normalized = m.replace("-", "")
-            # EINs don't start with 9 (that's usually SSN)
-            if len(normalized) == 9 and not normalized.startswith("9"):
-                return self._format_ein(m)
-
-        return None
-
-    def _find_ssn(self, text: str):
-        """Find SSN in text"""
-        # try labels first
-        for pattern in self._label_patterns["ssn"]:
-            match = pattern.search(text)
-            if match:
-                search_area = text[match.start():match.start() + 200]
-                ssn_match = self.SSN_PATTERN.search(search_area)
-                if ssn_match:
-                    return self._format_ssn(ssn_match.group(1))
-
-        # fallback
-        all_matches = self.SSN_PATTERN.findall(text)
-        for m in all_matches:
-            normalized = m.replace("-", "")
-            if len(normalized) == 9:
-                area = int(normalized[:3])
-                # SSN area can't be 000, 666, or 900-999
-                if area != 0 and area != 666 and area < 900:
-                    return self._format_ssn(m)
-
-        return None
-
-    def _find_currency(self, text: str, label_key: str):
-        """Find currency value near a label"""
-        for pattern in self._label_patterns[label_key]:
-            match = pattern.search(text)
-            if match:
-                search_area = text[match.end():match.end() + 100]
-                currency_match = self.CURRENCY_PATTERN.search(search_area)
-                if currency_match:
-                    return self._parse_currency(currency_match.group(1))
-        return None
-
-    def _format_ein(self, ein: str) -> str:
-        normalized = ein.replace("-", "")
-        return f"{normalized[:2]}-{normalized[2:]}" if len(normalized) == 9 else ein
-
-    def _format_ssn(self, ssn: str) -> str:
-        normalized = ssn.replace("-", "")
-        return f"{normalized[:3]}-{normalized[3:5]}-{normalized[5:]}" if len(normalized) == 9 else ssn
+        return W2ExtractedData(
+            ein=found["ein"],
+            ssn=found["ssn"],
+            wages=found["wages"],
+            federal_tax_withheld=found["fed_tax"],
+        )
+
+    def _extract_all(self, text: str) -> dict:
+        """
+        Find all fields in a single pass over the text.
+
+        Only the first hit of each label variant opens a window (same as
+        pattern.search), and the first matching value inside it fills that
+        variant. Afterwards each field takes its highest-priority filled
+        variant, falling back to the first plausible EIN/SSN anywhere.
+
+        Each field maps to (rank, value) - the label variant index, or
+        len(LABELS[key]) for a fallback - or None, so _scan can compare
+        hits across pages.
+
+        The scan stops as soon as every field's top-priority variant is
+        filled, since nothing later in the text can change the result.
+        """
+        windows = {}  # label group -> (value kind, lo, hi)
+        hits = {}  # label group -> raw value
+        fallback = {"ein": None, "ssn": None}
+        settled = {f"{key}_0" for key in self.LABELS}
+
+        # skip the label branches for fields whose keywords aren't on the page
+        lowered = text.lower()
+        fields = frozenset(
+            key
+            for key, words in self.LABEL_KEYWORDS.items()
+            if any(word in lowered for word in words)
+        )
+
+        # values are digits, so reading them off the lowered text is fine
+        for match in self._scanner(fields).finditer(lowered):
+            group = match.lastgroup
+
+            if group in self.VALUE_PATTERNS:
+                value = match.group(group)
+                start, end = match.span(group)
+                # any number after a box label counts as its amount
+                kinds = {group: value, "money": value.partition("-")[0]}
+                if group == "ssn" and "-" not in value:
+                    kinds["ein"] = value
+
+                filled = False
+                for name, (kind, lo, hi) in windows.items():
+                    if name not in hits and kind in kinds and lo <= start and end <= hi:
+                        hits[name] = kinds[kind]
+                        filled = True
+
+                if filled and settled.issubset(hits):
+                    break
+
+                # EINs don't start with 9 (that's usually SSN)
+                if "ein" in kinds and fallback["ein"] is None and value[0] != "9":
+                    fallback["ein"] = value
+                if "ssn" in kinds and fallback["ssn"] is None and self._valid_ssn_area(value):
+                    fallback["ssn"] = value
+
+            elif group not in windows:
+                # the group only spans the part after a shared prefix, but the
+                # lookahead sits at the label start, so that's match.start()
+                kind, at_end, size = self.WINDOWS[group.rsplit("_", 1)[0]]
+                anchor = match.end(group) if at_end else match.start()
+                windows[group] = (kind, anchor, anchor + size)
+
+        found = {}
+        for key, patterns in self.LABELS.items():
+            found[key] = next(
+                ((i, hits[f"{key}_{i}"]) for i in range(len(patterns)) if f"{key}_{i}" in hits),
+                None,
+            )
+            if found[key] is None and fallback.get(key):
+                found[key] = (len(patterns), fallback[key])
+
+        formatters = {
+            "ein": lambda raw: self._format_ein(raw.translate(_DASH_DEL)),
+            "ssn": lambda raw: self._format_ssn(raw.translate(_DASH_DEL)),
+            "wages": self._parse_currency,
+            "fed_tax": self._parse_currency,
+        }
+        for key, hit in found.items():
+            value = formatters[key](hit[1]) if hit else None
+            found[key] = (hit[0], value) if value is not None else None
+        return found
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _scanner(cls, fields: frozenset):
+        """
+        One scanner for the whole text, with label branches only for `fields`.
+
+        Labels are zero-width lookaheads so they don't consume the values
+        that follow them; each label variant gets its own group ("ein_0",
+        "ein_1", ...) so priority order survives the merge. Value patterns are
+        always included for the EIN/SSN fallbacks. At most 16 field subsets,
+        each compiled once.
+        """
+        labels = {key: patterns for key, patterns in cls.LABELS.items() if key in fields}
+        return re.compile("|".join(_label_branches(labels) + list(cls.VALUE_PATTERNS.values())))
+
+    def _valid_ssn_area(self, ssn: str) -> bool:
+        # candidates always start with 3 digits, so no slice/int() needed
+        area = ord(ssn[0]) * 100 + ord(ssn[1]) * 10 + ord(ssn[2]) - 5328  # 5328 = 111 * ord("0")
+        # SSN area can't be 000, 666, or 900-999
+        return 0 < area < 900 and area != 666
+
+    # both take the 9 digits with hyphens already stripped (the value
+    # patterns guarantee the length)
+    def _format_ein(self, digits: str) -> str:
+        return f"{digits[:2]}-{digits[2:]}"
+
+    def _format_ssn(self, digits: str) -> str:
+        return f"{digits[:3]}-{digits[3:5]}-{digits[5:]}"
 
     def _parse_currency(self, value: str):
         try:
@@ -216,3 +368,60 @@ class W2DataExtractor:
             return Decimal(cleaned) if cleaned else None
         except (InvalidOperation, ValueError):
             return None
+
+
+# PyMuPDF holds the GIL for most of a parse, so a thread pool wouldn't help -
+# the pool itself is built on first extract(), not at import, since every
+# spawned worker re-imports this module. "spawn" rather than the Linux
+# default fork: forking the threaded server copies its listening socket and
+# pipe fds into the worker, which then never exits after shutdown.
+_PDF_POOL = None
+# extract() may run on several loops/threads (async_to_sync), so creating
+# and swapping the pool is locked
+_PDF_POOL_LOCK = threading.Lock()
+
+
+def _get_pool():
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is None:
+            _PDF_POOL = ProcessPoolExecutor(
+                max_workers=settings.PDF_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _PDF_POOL
+
+
+def _replace_broken_pool(broken):
+    """Drop the broken pool so the next request builds a fresh one"""
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        # a concurrent request may have replaced it already
+        if _PDF_POOL is not broken:
+            return
+        _PDF_POOL = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    """
+    Stop the parse workers - called on ASGI lifespan shutdown
+
+    Blocks until running parses finish, so async callers should run it in
+    a thread.
+    """
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        pool, _PDF_POOL = _PDF_POOL, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def _read_all(file) -> bytes:
+    file.seek(0)
+    return file.read()
+
+
+def _scan_worker(file_content: bytes) -> dict:
+    """Top-level so it can be pickled into the process pool"""
+    return W2DataExtractor()._scan(file_content)
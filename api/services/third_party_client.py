@@ -7,6 +7,9 @@ Handles:
 """
 import asyncio
 import logging
+import os
+import random
+import time
 
 import httpx
 from django.conf import settings
@@ -19,12 +22,63 @@ from api.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+MAX_RETRY_DELAY = 10  # seconds, cap for a single backoff sleep
+
+# pooled clients shared across requests, keyed by connection config.
+# An AsyncClient is tied to the loop it first ran on, so pooling is only
+# switched on for the long-lived ASGI server loop (lifespan startup). Under
+# WSGI or the Django test client every request runs on a fresh
+# async_to_sync loop; there each ThirdPartyAPIClient owns a client and
+# closes it on exit instead of leaving stale pooled clients behind.
+_shared_clients = {}
+_pool_loop = None
+
+
+def _new_client(base_url, api_key, timeout):
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout),
+        headers={"X-API-Key": api_key},
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+
+
+def enable_shared_clients():
+    """Pool clients on the running loop - called on ASGI lifespan startup"""
+    global _pool_loop
+    _pool_loop = asyncio.get_running_loop()
+
+
+def _get_shared_client(base_url, api_key, timeout):
+    """Return the pooled client for this config, or None if not pooling here"""
+    if asyncio.get_running_loop() is not _pool_loop:
+        return None
+
+    key = (base_url, api_key, timeout)
+    client = _shared_clients.get(key)
+    if client is None or client.is_closed:
+        client = _shared_clients[key] = _new_client(base_url, api_key, timeout)
+    return client
+
+
+async def close_shared_clients():
+    """Close pooled clients and stop pooling - called on ASGI lifespan shutdown"""
+    global _pool_loop
+    _pool_loop = None
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+
+    for client in clients:
+        await client.aclose()
+
 
 class ThirdPartyAPIClient:
     """
     Async client for the third-party API.
     
     Features:
+    - Connection pooling shared across requests
     - Automatic retry with exponential backoff
     - Auth header management
     - Proper error handling
@@ -42,19 +96,23 @@ class ThirdPartyAPIClient:
         self.max_retries = max_retries or settings.THIRD_PARTY_API_RETRY_COUNT
         self.retry_delay = retry_delay or settings.THIRD_PARTY_API_RETRY_DELAY
         self._client = None
+        self._owns_client = False
 
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(
-            base_url=self.base_url,
-            timeout=httpx.Timeout(self.timeout),
-            headers={"X-API-Key": self.api_key},
-        )
+        # /files can't start before /reports returns its id, so the two calls
+        # stay sequential; the pooled client means both (and later requests)
+        # reuse warm keep-alive / HTTP/2 connections instead of new handshakes
+        self._client = _get_shared_client(self.base_url, self.api_key, self.timeout)
+        self._owns_client = self._client is None
+        if self._owns_client:
+            self._client = _new_client(self.base_url, self.api_key, self.timeout)
         return self
 
     async def __aexit__(self, *args):
-        if self._client:
+        # a pooled client outlives the request - see close_shared_clients()
+        if self._owns_client:
             await self._client.aclose()
-            self._client = None
+        self._client = None
 
     async def submit_report(self, w2_data: dict) -> str:
         """Submit W-2 data, returns report_id"""
@@ -69,8 +127,18 @@ class ThirdPartyAPIClient:
         logger.info(f"Report created: {report_id}")
         return report_id
 
-    async def upload_file(self, report_id: str, file_content: bytes, filename: str = "w2.pdf") -> str:
-        """Upload PDF file, returns file_id"""
+    async def upload_file(self, report_id: str, file_content, filename: str = "w2.pdf") -> str:
+        """
+        Upload PDF file, returns file_id
+
+        file_content can be bytes, a binary file object or a path; files and
+        paths are streamed by httpx in chunks rather than copied into memory.
+        """
+        if isinstance(file_content, (str, os.PathLike)):
+            # e.g. a spilled upload's temporary_file_path()
+            with open(file_content, "rb") as fh:
+                return await self.upload_file(report_id, fh, filename)
+
         logger.info(f"Uploading file for report {report_id}")
 
         files = {"file": (filename, file_content, "application/pdf")}
@@ -91,11 +159,18 @@ class ThirdPartyAPIClient:
             raise RuntimeError("Client not initialized - use 'async with'")
 
         last_error = None
+        # overall budget: every attempt may use its full timeout, no more
+        deadline = time.monotonic() + self.timeout * (self.max_retries + 1)
 
         for attempt in range(self.max_retries + 1):
             try:
                 logger.debug(f"Request attempt {attempt + 1}/{self.max_retries + 1}: {method} {endpoint}")
 
+                # a streamed file was consumed by the previous attempt
+                for _, content, *_ in (files or {}).values():
+                    if hasattr(content, "seek"):
+                        content.seek(0)
+
                 response = await self._client.request(
                     method=method,
                     url=endpoint,
@@ -132,10 +207,14 @@ class ThirdPartyAPIClient:
                 else:
                     raise  # don't retry 4xx
 
-            # exponential backoff
+            # exponential backoff with full jitter, so workers that failed
+            # together don't retry together
             if attempt < self.max_retries:
-                delay = self.retry_delay * (2 ** attempt)
-                logger.debug(f"Retrying in {delay}s...")
+                delay = random.uniform(0, min(self.retry_delay * (2 ** attempt), MAX_RETRY_DELAY))
+                if time.monotonic() + delay > deadline:
+                    logger.warning(f"Retry budget exhausted after {attempt + 1} attempts: {endpoint}")
+                    break
+                logger.debug(f"Retrying in {delay:.2f}s...")
                 await asyncio.sleep(delay)
 
         # all retries failed
@@ -3,7 +3,6 @@ W-2 Processing API Views
 """
 import logging
 
-from asgiref.sync import async_to_sync
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from rest_framework import status, serializers
@@ -11,12 +10,15 @@ from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .exceptions import InvalidFileException
-from .serializers import W2UploadSerializer
+from .async_views import AsyncAPIView
+from .serializers import validate_upload
 from .services import ThirdPartyAPIClient, W2DataExtractor
 
 logger = logging.getLogger(__name__)
 
+# extractor is stateless, so one instance serves every request
+_EXTRACTOR = W2DataExtractor()
+
 
 # Response serializers for Swagger documentation
 class HealthResponseSerializer(serializers.Serializer):
@@ -71,12 +73,12 @@ class HealthCheckView(APIView):
         })
 
 
-class W2ProcessView(APIView):
+class W2ProcessView(AsyncAPIView):
     """
     Endpoint for processing W-2 PDFs.
     
-    The view method is sync (DRF limitation), but internal processing
-    is async via async_to_sync wrapper.
+    The handler is a coroutine, so the event loop is free while the
+    third-party API calls are in flight.
     """
     parser_classes = [MultiPartParser, FormParser]
 
@@ -151,28 +153,18 @@ Upload a W-2 PDF file to extract tax data and report to third-party API.
         ],
         tags=["W-2 Processing"],
     )
-    def post(self, request):
+    async def post(self, request):
         """Process W-2 PDF file"""
         logger.info("Processing W-2 upload request")
 
-        # validate the file
-        serializer = W2UploadSerializer(data=request.data)
-        if not serializer.is_valid():
-            logger.warning(f"Validation failed: {serializer.errors}")
-            raise InvalidFileException(
-                detail=self._format_errors(serializer.errors),
-                code="file_validation_failed",
-            )
+        # validate the file (plain checks, no serializer binding)
+        uploaded_file = request.FILES.get("file")
+        validate_upload(uploaded_file)
 
-        uploaded_file = serializer.validated_data["file"]
         filename = uploaded_file.name
         logger.info(f"Processing: {filename} ({uploaded_file.size} bytes)")
 
-        # read file content
-        file_content = uploaded_file.read()
-
-        # async processing wrapped for DRF compatibility
-        result = async_to_sync(self._process_async)(file_content, filename)
+        result = await self._process_async(uploaded_file, filename)
 
         return Response({
             "success": True,
@@ -184,11 +176,11 @@ Upload a W-2 PDF file to extract tax data and report to third-party API.
             "extracted_data": result["extracted_data"],
         })
 
-    async def _process_async(self, file_content, filename):
+    async def _process_async(self, uploaded_file, filename):
         """Async processing logic."""
-        # extract data from PDF
-        extractor = W2DataExtractor()
-        extracted = await extractor.extract(file_content)
+        # the extractor reads the handle itself and drops the bytes when done;
+        # the upload below streams from the same handle
+        extracted = await _EXTRACTOR.extract(uploaded_file.file)
         
         # mask sensitive data in logs
         logger.info(f"Extracted - EIN: **-***{extracted.ein[-4:]}, SSN: ***-**-{extracted.ssn[-4:]}")
@@ -198,7 +190,7 @@ Upload a W-2 PDF file to extract tax data and report to third-party API.
             report_id = await client.submit_report(extracted.to_dict())
             logger.info(f"Report created: {report_id}")
 
-            file_id = await client.upload_file(report_id, file_content, filename)
+            file_id = await client.upload_file(report_id, uploaded_file.file, filename)
             logger.info(f"File uploaded: {file_id}")
 
         return {
@@ -206,13 +198,3 @@ Upload a W-2 PDF file to extract tax data and report to third-party API.
             "file_id": file_id,
             "extracted_data": extracted.to_dict(),
         }
-
-    def _format_errors(self, errors):
-        """Flatten validation errors into a string"""
-        msgs = []
-        for field, errs in errors.items():
-            if isinstance(errs, list):
-                msgs.extend(str(e) for e in errs)
-            else:
-                msgs.append(str(errs))
-        return "; ".join(msgs)
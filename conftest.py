@@ -3,7 +3,7 @@ import io
 import pytest
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_w2_pdf_content():
     """Minimal valid PDF with W-2 data"""
     # this is a bare-bones PDF structure with text content
@@ -64,19 +64,19 @@ startxref
 
 @pytest.fixture
 def sample_w2_pdf_file(sample_w2_pdf_content):
-    """File-like object with sample PDF"""
+    """File-like object with sample PDF (fresh per test, tests move its position)"""
     f = io.BytesIO(sample_w2_pdf_content)
     f.name = "test_w2.pdf"
     return f
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def invalid_pdf_content():
     """Not a valid PDF"""
     return b"this is not a pdf file"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def empty_pdf_content():
     """Valid PDF structure but no pages"""
     return b"""%PDF-1.4
@@ -3,27 +3,61 @@ Mock third-party API
 
 Simulates the external W-2 reporting service for dev/testing.
 
-Auth: X-API-Key: FinPro-Secret-Key
+Auth: X-API-Key matching settings.THIRD_PARTY_API_KEY (default FinPro-Secret-Key)
 POST /reports -> {"report_id": "..."}
 POST /files -> {"file_id": "..."}
 """
+import asyncio
+import hashlib
+import hmac
 import logging
-import uuid
+import secrets
 
+import orjson
+from cachetools import TTLCache
+from django.conf import settings
+from django.http import HttpResponse
+from drf_orjson_renderer.parsers import ORJSONParser
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from rest_framework import status, serializers
-from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.exceptions import UnsupportedMediaType
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework.views import APIView
+
+from api.async_views import AsyncAPIView
 
 logger = logging.getLogger(__name__)
 
-API_KEY = "FinPro-Secret-Key"
+# the same key the real client sends, so both sides can't drift apart;
+# encoded once here, requests only run compare_digest on the bytes
+API_KEY = settings.THIRD_PARTY_API_KEY
+_API_KEY_BYTES = API_KEY.encode("latin-1")
+
+_REQUIRED_REPORT_FIELDS = ("ein", "ssn", "wages", "federal_tax_withheld")
+_REQUIRED_REPORT_SET = frozenset(_REQUIRED_REPORT_FIELDS)
+
+# 401 bodies rendered once; each failure only wraps them in a new response,
+# since middleware mutates headers and a shared response object would leak
+_MISSING_KEY_BODY = orjson.dumps({"error": "Missing X-API-Key"})
+_INVALID_KEY_BODY = orjson.dumps({"error": "Invalid API key"})
+
+
+def _json_bytes(body, status_code):
+    """Plain Django response around already-encoded JSON"""
+    return HttpResponse(body, content_type="application/json", status=status_code)
+
 
-# in-memory storage (good enough for mock)
-_reports = {}
-_files = {}
+# in-memory storage (good enough for mock), bounded and expiring so soak
+# tests and long-running dev servers don't grow it forever
+_MAX_ENTRIES = 50_000
+_ENTRY_TTL = 3600  # seconds
+# keyed by raw 16-byte ids; only their hex form goes over the wire
+_reports = TTLCache(maxsize=_MAX_ENTRIES, ttl=_ENTRY_TTL)
+_files = TTLCache(maxsize=_MAX_ENTRIES, ttl=_ENTRY_TTL)
+# (report_id, content digest) -> file key, so a retried upload of the same
+# PDF for the same report gets its original file_id back
+_file_ids = TTLCache(maxsize=_MAX_ENTRIES, ttl=_ENTRY_TTL)
 
 
 # Serializers for Swagger documentation
@@ -46,28 +80,45 @@ class MockErrorSerializer(serializers.Serializer):
     error = serializers.CharField()
 
 
+# shared by both views' schemas
+_API_KEY_PARAM = OpenApiParameter(
+    name="X-API-Key",
+    type=str,
+    location=OpenApiParameter.HEADER,
+    required=True,
+    description="API authentication key",
+    examples=[
+        OpenApiExample("Valid Key", value="FinPro-Secret-Key"),
+    ],
+)
+
+
 class MockAPIAuthMixin:
     """Check X-API-Key header"""
 
     def check_auth(self, request):
-        key = request.headers.get("X-API-Key")
+        # META directly, skips building the request.headers wrapper
+        key = request.META.get("HTTP_X_API_KEY")
         if not key:
-            return Response({"error": "Missing X-API-Key"}, status=status.HTTP_401_UNAUTHORIZED)
-        if key != API_KEY:
-            return Response({"error": "Invalid API key"}, status=status.HTTP_401_UNAUTHORIZED)
+            return _json_bytes(_MISSING_KEY_BODY, status.HTTP_401_UNAUTHORIZED)
+        # header values arrive latin-1 decoded, so this round-trips exactly
+        if not hmac.compare_digest(key.encode("latin-1", "replace"), _API_KEY_BYTES):
+            return _json_bytes(_INVALID_KEY_BODY, status.HTTP_401_UNAUTHORIZED)
         return None
 
 
-class MockReportView(MockAPIAuthMixin, APIView):
+class MockReportView(MockAPIAuthMixin, AsyncAPIView):
     """POST /reports - submit W-2 data"""
-    parser_classes = [JSONParser]
+    # post() decodes the body itself, but keeps this parser's contract:
+    # JSON only, anything else is a 415 (also what the schema documents)
+    parser_classes = [ORJSONParser]
 
     @extend_schema(
         summary="Submit W-2 Report",
         description="""
 Submit extracted W-2 data to create a report.
 
-**Authentication:** Requires `X-API-Key: FinPro-Secret-Key` header.
+**Authentication:** Requires an `X-API-Key` header matching the `THIRD_PARTY_API_KEY` setting (default `FinPro-Secret-Key`).
 
 Returns a unique `report_id` to be used when uploading the PDF file.
         """,
@@ -77,18 +128,7 @@ Returns a unique `report_id` to be used when uploading the PDF file.
             400: MockErrorSerializer,
             401: MockErrorSerializer,
         },
-        parameters=[
-            OpenApiParameter(
-                name="X-API-Key",
-                type=str,
-                location=OpenApiParameter.HEADER,
-                required=True,
-                description="API authentication key",
-                examples=[
-                    OpenApiExample("Valid Key", value="FinPro-Secret-Key"),
-                ],
-            ),
-        ],
+        parameters=[_API_KEY_PARAM],
         examples=[
             OpenApiExample(
                 "Valid Request",
@@ -102,45 +142,62 @@ Returns a unique `report_id` to be used when uploading the PDF file.
             ),
             OpenApiExample(
                 "Success Response",
-                value={"report_id": "550e8400-e29b-41d4-a716-446655440000"},
+                value={"report_id": "550e8400e29b41d4a716446655440000"},
                 response_only=True,
                 status_codes=["201"],
             ),
         ],
         tags=["Mock API"],
     )
-    def post(self, request):
+    async def post(self, request):
         auth_err = self.check_auth(request)
         if auth_err:
             return auth_err
 
-        data = request.data
-        required = ["ein", "ssn", "wages", "federal_tax_withheld"]
-        missing = [f for f in required if f not in data]
+        # tiny body, so skip DRF's parser/renderer negotiation and go
+        # straight from bytes to bytes
+        media_type = request.content_type.split(";", 1)[0].strip().lower()
+        if media_type != ORJSONParser.media_type:
+            raise UnsupportedMediaType(media_type)
+
+        try:
+            data = orjson.loads(request.body)
+        except orjson.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
+            return _json_bytes(
+                orjson.dumps({"error": "Request body must be a JSON object"}),
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        missing = _REQUIRED_REPORT_SET.difference(data)
 
         if missing:
-            return Response(
-                {"error": f"Missing fields: {', '.join(missing)}"},
-                status=status.HTTP_400_BAD_REQUEST
+            # report them in the documented order, not set order
+            names = ", ".join(f for f in _REQUIRED_REPORT_FIELDS if f in missing)
+            return _json_bytes(
+                orjson.dumps({"error": f"Missing fields: {names}"}),
+                status.HTTP_400_BAD_REQUEST
             )
 
-        report_id = str(uuid.uuid4())
-        _reports[report_id] = {"data": data}
+        key = secrets.token_bytes(16)
+        _reports[key] = {"data": data}
+        report_id = key.hex()
 
-        logger.info(f"Mock: created report {report_id}")
-        return Response({"report_id": report_id}, status=status.HTTP_201_CREATED)
+        logger.info("Mock: created report %s", report_id)
+        return _json_bytes(orjson.dumps({"report_id": report_id}), status.HTTP_201_CREATED)
 
 
-class MockFileUploadView(MockAPIAuthMixin, APIView):
+class MockFileUploadView(MockAPIAuthMixin, AsyncAPIView):
     """POST /files - upload PDF"""
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser]
 
     @extend_schema(
         summary="Upload W-2 PDF File",
         description="""
 Upload the original W-2 PDF file associated with a report.
 
-**Authentication:** Requires `X-API-Key: FinPro-Secret-Key` header.
+**Authentication:** Requires an `X-API-Key` header matching the `THIRD_PARTY_API_KEY` setting (default `FinPro-Secret-Key`).
 
 **Prerequisites:** Must first create a report via POST /reports to get a `report_id`.
         """,
@@ -166,34 +223,23 @@ Upload the original W-2 PDF file associated with a report.
             400: MockErrorSerializer,
             401: MockErrorSerializer,
         },
-        parameters=[
-            OpenApiParameter(
-                name="X-API-Key",
-                type=str,
-                location=OpenApiParameter.HEADER,
-                required=True,
-                description="API authentication key",
-                examples=[
-                    OpenApiExample("Valid Key", value="FinPro-Secret-Key"),
-                ],
-            ),
-        ],
+        parameters=[_API_KEY_PARAM],
         examples=[
             OpenApiExample(
                 "Success Response",
-                value={"file_id": "7c9e6679-7425-40de-944b-e07fc1f90ae7"},
+                value={"file_id": "7c9e6679742540de944be07fc1f90ae7"},
                 response_only=True,
                 status_codes=["201"],
             ),
         ],
         tags=["Mock API"],
     )
-    def post(self, request):
+    async def post(self, request):
         auth_err = self.check_auth(request)
         if auth_err:
             return auth_err
 
-        report_id = request.data.get("report_id")
+        report_id = request.POST.get("report_id")
         if not report_id:
             return Response({"error": "Missing report_id"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -201,24 +247,52 @@ Upload the original W-2 PDF file associated with a report.
         if not uploaded:
             return Response({"error": "Missing file"}, status=status.HTTP_400_BAD_REQUEST)
 
-        file_id = str(uuid.uuid4())
-        _files[file_id] = {
+        # hashing may walk a spilled temp file, keep that off the event loop
+        dedup_key = (report_id, await asyncio.to_thread(_digest, uploaded))
+
+        key = _file_ids.get(dedup_key)
+        if key in _files:
+            file_id = key.hex()
+            logger.info("Mock: duplicate upload, reusing file %s for report %s", file_id, report_id)
+            return Response({"file_id": file_id}, status=status.HTTP_201_CREATED)
+
+        key = secrets.token_bytes(16)
+        _files[key] = {
             "report_id": report_id,
             "filename": uploaded.name,
             "size": uploaded.size,
         }
+        _file_ids[dedup_key] = key
+        file_id = key.hex()
 
-        logger.info(f"Mock: uploaded file {file_id} for report {report_id}")
+        logger.info("Mock: uploaded file %s for report %s", file_id, report_id)
         return Response({"file_id": file_id}, status=status.HTTP_201_CREATED)
 
 
+def _digest(uploaded):
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in uploaded.chunks():
+        digest.update(chunk)
+    return digest.digest()
+
+
+def _store_key(hex_id):
+    try:
+        return bytes.fromhex(hex_id)
+    except ValueError:
+        return None
+
+
 # test utilities
 def get_report(report_id):
-    return _reports.get(report_id)
+    return _reports.get(_store_key(report_id))
+
 
 def get_file(file_id):
-    return _files.get(file_id)
+    return _files.get(_store_key(file_id))
+
 
 def clear_storage():
     _reports.clear()
     _files.clear()
+    _file_ids.clear()
@@ -5,6 +5,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 from decimal import Decimal
 
 from rest_framework.test import APIClient
+from api.exceptions import DataExtractionException
 from api.services.pdf_extractor import W2ExtractedData
 
 
@@ -62,17 +63,15 @@ class TestW2ProcessView:
 
     @pytest.mark.django_db
     @patch("api.views.ThirdPartyAPIClient")
-    @patch("api.views.W2DataExtractor")
-    def test_success(self, mock_extractor_cls, mock_client_cls, client, sample_w2_pdf_content):
+    @patch("api.views._EXTRACTOR")
+    def test_success(self, mock_extractor, mock_client_cls, client, sample_w2_pdf_content):
         # mock extractor
-        mock_extractor = MagicMock()
         mock_extractor.extract = AsyncMock(return_value=W2ExtractedData(
             ein="12-3456789",
             ssn="123-45-6789",
             wages=Decimal("75000"),
             federal_tax_withheld=Decimal("12500"),
         ))
-        mock_extractor_cls.return_value = mock_extractor
 
         # mock client
         mock_client = MagicMock()
@@ -93,6 +92,28 @@ class TestW2ProcessView:
         assert data["data"]["report_id"] == "report-123"
         assert data["data"]["file_id"] == "file-456"
 
+    @pytest.mark.django_db
+    @patch("api.views._EXTRACTOR")
+    def test_extraction_error_body(self, mock_extractor, client, sample_w2_pdf_content):
+        mock_extractor.extract = AsyncMock(side_effect=DataExtractionException(
+            "Could not extract: EIN", code="missing_fields", field="ein",
+        ))
+
+        f = io.BytesIO(sample_w2_pdf_content)
+        f.name = "w2.pdf"
+
+        resp = client.post("/api/w2/process/", {"file": f})
+
+        assert resp.status_code == 422
+        assert resp.json() == {
+            "success": False,
+            "error": {
+                "code": "data_extraction_error",
+                "message": "Could not extract: EIN",
+                "details": {"field": "ein"},
+            },
+        }
+
 
 class TestMockAPI:
 
@@ -100,6 +121,7 @@ class TestMockAPI:
     def test_reports_no_auth(self, client):
         resp = client.post("/mock-api/reports", {"ein": "12-3456789"}, format="json")
         assert resp.status_code == 401
+        assert resp.json() == {"error": "Missing X-API-Key"}
 
     @pytest.mark.django_db
     def test_reports_wrong_key(self, client):
@@ -110,6 +132,7 @@ class TestMockAPI:
             HTTP_X_API_KEY="wrong"
         )
         assert resp.status_code == 401
+        assert resp.json() == {"error": "Invalid API key"}
 
     @pytest.mark.django_db
     def test_reports_success(self, client, auth_headers):
@@ -127,11 +150,32 @@ class TestMockAPI:
         assert resp.status_code == 201
         assert "report_id" in resp.json()
 
+        from mock_api.views import get_report
+        assert get_report(resp.json()["report_id"])["data"]["ein"] == "12-3456789"
+
     @pytest.mark.django_db
     def test_reports_missing_fields(self, client, auth_headers):
         resp = client.post("/mock-api/reports", {"ein": "12-3456789"}, format="json", **auth_headers)
         assert resp.status_code == 400
 
+    @pytest.mark.django_db
+    def test_reports_malformed_json(self, client, auth_headers):
+        resp = client.post(
+            "/mock-api/reports", "{not json", content_type="application/json", **auth_headers
+        )
+        assert resp.status_code == 400
+        assert "error" in resp.json()
+
+    @pytest.mark.django_db
+    def test_reports_rejects_non_json(self, client, auth_headers):
+        resp = client.post(
+            "/mock-api/reports",
+            '{"ein": "12-3456789", "ssn": "123-45-6789", "wages": "1", "federal_tax_withheld": "1"}',
+            content_type="text/plain",
+            **auth_headers,
+        )
+        assert resp.status_code == 415
+
     @pytest.mark.django_db
     def test_files_success(self, client, auth_headers, sample_w2_pdf_content):
         # create report first
@@ -155,6 +199,24 @@ class TestMockAPI:
         assert resp.status_code == 201
         assert "file_id" in resp.json()
 
+    @pytest.mark.django_db
+    def test_files_duplicate_upload_reuses_id(self, client, auth_headers, sample_w2_pdf_content):
+        def upload(report_id):
+            f = io.BytesIO(sample_w2_pdf_content)
+            f.name = "w2.pdf"
+            resp = client.post(
+                "/mock-api/files",
+                {"report_id": report_id, "file": f},
+                format="multipart",
+                **auth_headers,
+            )
+            assert resp.status_code == 201
+            return resp.json()["file_id"]
+
+        first = upload("report-a")
+        assert upload("report-a") == first
+        assert upload("report-b") != first
+
     @pytest.mark.django_db
     def test_files_missing_report_id(self, client, auth_headers, sample_w2_pdf_content):
         f = io.BytesIO(sample_w2_pdf_content)
@@ -162,7 +224,34 @@ class TestMockAPI:
         resp = client.post("/mock-api/files", {"file": f}, format="multipart", **auth_headers)
         assert resp.status_code == 400
 
+    @pytest.mark.django_db
+    def test_files_rejects_urlencoded(self, client, auth_headers):
+        resp = client.post(
+            "/mock-api/files",
+            "report_id=xxx",
+            content_type="application/x-www-form-urlencoded",
+            **auth_headers,
+        )
+        assert resp.status_code == 415
+
     @pytest.mark.django_db
     def test_files_missing_file(self, client, auth_headers):
         resp = client.post("/mock-api/files", {"report_id": "xxx"}, format="multipart", **auth_headers)
         assert resp.status_code == 400
+
+    @pytest.mark.django_db
+    def test_files_large_upload_size(self, client, auth_headers, sample_w2_pdf_content):
+        # over FILE_UPLOAD_MAX_MEMORY_SIZE, so this one lands in a temp file
+        from mock_api.views import get_file
+
+        content = sample_w2_pdf_content + b"\0" * (512 * 1024)
+        f = io.BytesIO(content)
+        f.name = "w2.pdf"
+        resp = client.post(
+            "/mock-api/files",
+            {"report_id": "xxx", "file": f},
+            format="multipart",
+            **auth_headers,
+        )
+        assert resp.status_code == 201
+        assert get_file(resp.json()["file_id"])["size"] == len(content)
@@ -1,7 +1,13 @@
 """Tests for PDF extraction"""
+import os
+import signal
+
+import fitz
 import pytest
 from decimal import Decimal
+from unittest.mock import MagicMock, patch
 
+from api.services import pdf_extractor
 from api.services.pdf_extractor import W2DataExtractor, W2ExtractedData
 from api.exceptions import PDFParsingException, DataExtractionException
 
@@ -20,6 +26,12 @@ class TestW2DataExtractor:
         assert result.wages is not None
         assert result.federal_tax_withheld is not None
 
+    @pytest.mark.asyncio
+    async def test_extract_from_file(self, extractor, sample_w2_pdf_file, sample_w2_pdf_content):
+        sample_w2_pdf_file.read(4)  # position shouldn't matter
+        result = await extractor.extract(sample_w2_pdf_file)
+        assert result == await extractor.extract(sample_w2_pdf_content)
+
     @pytest.mark.asyncio
     async def test_invalid_pdf_raises(self, extractor, invalid_pdf_content):
         with pytest.raises(PDFParsingException):
@@ -32,17 +44,26 @@ class TestW2DataExtractor:
 
     def test_format_ein(self, extractor):
         assert extractor._format_ein("123456789") == "12-3456789"
-        assert extractor._format_ein("12-3456789") == "12-3456789"
 
     def test_format_ssn(self, extractor):
         assert extractor._format_ssn("123456789") == "123-45-6789"
-        assert extractor._format_ssn("123-45-6789") == "123-45-6789"
 
     def test_parse_currency(self, extractor):
         assert extractor._parse_currency("1,234.56") == Decimal("1234.56")
         assert extractor._parse_currency("1234.56") == Decimal("1234.56")
         assert extractor._parse_currency("invalid") is None
 
+    @pytest.mark.asyncio
+    async def test_repeat_pdf_served_from_cache(self, extractor, sample_w2_pdf_content):
+        first = await extractor.extract(sample_w2_pdf_content)
+
+        pool = MagicMock()
+        pool.submit.side_effect = AssertionError("PDF parsed twice")
+        with patch("api.services.pdf_extractor._PDF_POOL", pool):
+            second = await extractor.extract(sample_w2_pdf_content)
+
+        assert second == first
+
     def test_to_dict(self):
         data = W2ExtractedData(
             ein="12-3456789",
@@ -55,6 +76,37 @@ class TestW2DataExtractor:
         assert result["wages"] == "75000.00"
 
 
+class TestMultiPage:
+
+    @pytest.fixture
+    def extractor(self):
+        return W2DataExtractor()
+
+    def test_labeled_page_beats_cover_sheet(self, extractor):
+        doc = fitz.open()
+        for lines in (
+            ["Payroll cover sheet", "account 45-1234567", "Ref 321-54-9876", "Box 1 see page 2: 3.00"],
+            [
+                "b Employer identification number (EIN): 98-7654321",
+                "a Employee's social security number 123-45-6789",
+                "1 Wages, tips, other compensation $85,000.00",
+                "2 Federal income tax withheld $12,500.00",
+            ],
+        ):
+            page = doc.new_page()
+            for i, line in enumerate(lines):
+                page.insert_text((72, 72 + 20 * i), line)
+        content = doc.tobytes()
+        doc.close()
+
+        assert extractor._scan(content) == {
+            "wages": Decimal("85000.00"),
+            "fed_tax": Decimal("12500.00"),
+            "ein": "98-7654321",
+            "ssn": "123-45-6789",
+        }
+
+
 class TestEINExtraction:
 
     @pytest.fixture
@@ -63,11 +115,20 @@ class TestEINExtraction:
 
     def test_ein_with_hyphen(self, extractor):
         text = "Employer identification number (EIN): 12-3456789"
-        assert extractor._find_ein(text) == "12-3456789"
+        assert extractor._extract_all(text)["ein"][1] == "12-3456789"
 
     def test_ein_without_hyphen(self, extractor):
         text = "b Employer's EIN 123456789"
-        assert extractor._find_ein(text) == "12-3456789"
+        assert extractor._extract_all(text)["ein"][1] == "12-3456789"
+
+    def test_ein_without_label(self, extractor):
+        # no label keywords at all, only the fallback scan applies
+        text = "Form W-2 2024 12-3456789"
+        assert extractor._extract_all(text)["ein"] == (3, "12-3456789")
+
+    def test_ein_possessive_label(self, extractor):
+        text = "b Employer's identification number 98-7654321"
+        assert extractor._extract_all(text)["ein"][1] == "98-7654321"
 
 
 class TestSSNExtraction:
@@ -78,11 +139,15 @@ class TestSSNExtraction:
 
     def test_ssn_with_hyphens(self, extractor):
         text = "a Employee's social security number 123-45-6789"
-        assert extractor._find_ssn(text) == "123-45-6789"
+        assert extractor._extract_all(text)["ssn"][1] == "123-45-6789"
 
     def test_ssn_without_hyphens(self, extractor):
         text = "Social Security Number: 123456789"
-        assert extractor._find_ssn(text) == "123-45-6789"
+        assert extractor._extract_all(text)["ssn"][1] == "123-45-6789"
+
+    def test_fallback_skips_invalid_area(self, extractor):
+        text = "000-12-3456 666-12-3456 912-34-5678 123-45-6789"
+        assert extractor._extract_all(text)["ssn"][1] == "123-45-6789"
 
 
 class TestCurrencyExtraction:
@@ -93,8 +158,34 @@ class TestCurrencyExtraction:
 
     def test_wages_extraction(self, extractor):
         text = "1 Wages, tips, other compensation $75,000.00"
-        assert extractor._find_currency(text, "wages") == Decimal("75000.00")
+        assert extractor._extract_all(text)["wages"][1] == Decimal("75000.00")
 
     def test_fed_tax_extraction(self, extractor):
         text = "2 Federal income tax withheld $12,500.00"
-        assert extractor._find_currency(text, "fed_tax") == Decimal("12500.00")
+        assert extractor._extract_all(text)["fed_tax"][1] == Decimal("12500.00")
+
+    @pytest.mark.asyncio
+    async def test_recovers_from_dead_worker(self, extractor, sample_w2_pdf_content):
+        await extractor.extract(sample_w2_pdf_content)  # make sure workers are up
+        broken = pdf_extractor._PDF_POOL
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+        pdf_extractor._EXTRACT_CACHE.clear()
+
+        with pytest.raises(PDFParsingException) as exc_info:
+            await extractor.extract(sample_w2_pdf_content)
+        assert exc_info.value.get_codes() == "pdf_parse_error"
+        assert pdf_extractor._PDF_POOL is None
+
+        result = await extractor.extract(sample_w2_pdf_content)
+        assert result.ein is not None
+
+    @pytest.mark.asyncio
+    async def test_pool_built_on_demand(self, extractor, sample_w2_pdf_content):
+        pdf_extractor.shutdown_pool()
+        assert pdf_extractor._PDF_POOL is None
+        pdf_extractor._EXTRACT_CACHE.clear()
+
+        result = await extractor.extract(sample_w2_pdf_content)
+        assert result.ein is not None
+        assert pdf_extractor._PDF_POOL is not None
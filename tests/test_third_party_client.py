@@ -1,9 +1,15 @@
 """Tests for third-party API client"""
+import io
 import pytest
 import httpx
 from unittest.mock import AsyncMock, patch, MagicMock
 
-from api.services.third_party_client import ThirdPartyAPIClient, process_w2_with_api
+from api.services.third_party_client import (
+    ThirdPartyAPIClient,
+    close_shared_clients,
+    enable_shared_clients,
+    process_w2_with_api,
+)
 from api.exceptions import (
     ThirdPartyAPIException,
     ThirdPartyAuthenticationException,
@@ -68,6 +74,27 @@ class TestThirdPartyAPIClient:
 
             assert result == "file-456"
 
+    @pytest.mark.asyncio
+    async def test_upload_file_from_path(self, config, tmp_path):
+        pdf_path = tmp_path / "test.pdf"
+        pdf_path.write_bytes(b"%PDF")
+        mock_resp = MagicMock()
+        mock_resp.status_code = 201
+        mock_resp.json.return_value = {"file_id": "file-456"}
+
+        sent = []
+
+        async def fake_request(method, url, files=None, **kwargs):
+            sent.append(files["file"][1].read())
+            return mock_resp
+
+        with patch.object(httpx.AsyncClient, "request", side_effect=fake_request):
+            async with ThirdPartyAPIClient(**config) as client:
+                result = await client.upload_file("report-123", pdf_path, "test.pdf")
+
+        assert result == "file-456"
+        assert sent == [b"%PDF"]
+
     @pytest.mark.asyncio
     async def test_timeout_raises(self, config):
         with patch.object(httpx.AsyncClient, "request", new_callable=AsyncMock) as mock_req:
@@ -96,6 +123,48 @@ class TestThirdPartyAPIClient:
             assert result == "test-123"
             assert mock_req.call_count == 2
 
+    @pytest.mark.asyncio
+    async def test_retry_stops_at_deadline(self, config):
+        resp_500 = MagicMock()
+        resp_500.status_code = 500
+        resp_500.text = "Server Error"
+
+        config["timeout"] = 0.1  # budget 0.3s, less than one backoff sleep
+
+        with patch.object(httpx.AsyncClient, "request", new_callable=AsyncMock) as mock_req, \
+             patch("api.services.third_party_client.random.uniform", return_value=1.0):
+            mock_req.return_value = resp_500
+
+            async with ThirdPartyAPIClient(**config) as client:
+                with pytest.raises(ThirdPartyAPIException):
+                    await client.submit_report({})
+
+            assert mock_req.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_rewinds_file_upload(self, config):
+        resp_500 = MagicMock()
+        resp_500.status_code = 500
+        resp_500.text = "Server Error"
+
+        resp_201 = MagicMock()
+        resp_201.status_code = 201
+        resp_201.json.return_value = {"file_id": "file-456"}
+
+        sent = []
+        responses = iter([resp_500, resp_201])
+
+        async def fake_request(method, url, files=None, **kwargs):
+            sent.append(files["file"][1].read())
+            return next(responses)
+
+        with patch.object(httpx.AsyncClient, "request", side_effect=fake_request):
+            async with ThirdPartyAPIClient(**config) as client:
+                result = await client.upload_file("report-123", io.BytesIO(b"%PDF"), "test.pdf")
+
+        assert result == "file-456"
+        assert sent == [b"%PDF", b"%PDF"]
+
     @pytest.mark.asyncio
     async def test_no_retry_on_400(self, config):
         resp_400 = MagicMock()
@@ -112,6 +181,27 @@ class TestThirdPartyAPIClient:
 
             assert mock_req.call_count == 1  # no retry
 
+    @pytest.mark.asyncio
+    async def test_reuses_pooled_client(self, config):
+        enable_shared_clients()
+        async with ThirdPartyAPIClient(**config) as first:
+            pooled = first._client
+        async with ThirdPartyAPIClient(**config) as second:
+            assert second._client is pooled
+
+        await close_shared_clients()
+        assert pooled.is_closed
+
+    @pytest.mark.asyncio
+    async def test_own_client_without_pool(self, config):
+        # no lifespan startup (WSGI, test client): nothing may outlive the request
+        async with ThirdPartyAPIClient(**config) as first:
+            own = first._client
+        async with ThirdPartyAPIClient(**config) as second:
+            assert second._client is not own
+
+        assert own.is_closed
+
 
 class TestProcessW2WithAPI:
 
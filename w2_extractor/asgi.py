@@ -7,11 +7,36 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "w2_extractor.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.services.pdf_extractor import shutdown_pool  # noqa: E402
+from api.services.third_party_client import (  # noqa: E402
+    close_shared_clients,
+    enable_shared_clients,
+)
+
+
+async def application(scope, receive, send):
+    """Django app plus ASGI lifespan, so pooled clients and workers stop on shutdown"""
+    if scope["type"] != "lifespan":
+        return await django_application(scope, receive, send)
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            enable_shared_clients()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_shared_clients()
+            # waits for in-flight parses, keep the loop free meanwhile
+            await asyncio.to_thread(shutdown_pool)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
 
@@ -51,6 +51,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # test runs (pytest-django included) use a shared in-memory db, never
+        # the file above - pinned so a TEST NAME override doesn't sneak in disk I/O
+        "TEST": {"NAME": ":memory:"},
     }
 }
 
@@ -64,13 +67,14 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # DRF
 REST_FRAMEWORK = {
+    # orjson-backed JSON in and out, same media types as DRF's stdlib classes
     "DEFAULT_PARSER_CLASSES": [
-        "rest_framework.parsers.JSONParser",
+        "drf_orjson_renderer.parsers.ORJSONParser",
         "rest_framework.parsers.MultiPartParser",
         "rest_framework.parsers.FormParser",
     ],
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "drf_orjson_renderer.renderers.ORJSONRenderer",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [],
     "DEFAULT_PERMISSION_CLASSES": [],
@@ -95,10 +99,20 @@ SPECTACULAR_SETTINGS = {
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 
 # file uploads
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# anything over 256KB spills to a temp file (TemporaryFileUploadHandler)
+# instead of sitting in memory for the whole request
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024
 
+# PDF parse processes per server worker. By default the cores are split
+# across uvicorn's $WEB_CONCURRENCY workers so N workers don't each start
+# one parser per core. Only the env var is honoured - set it instead of
+# passing --workers, which the settings can't see.
+PDF_POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", "0")) or max(
+    1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))
+)
+
 # third-party API config
 THIRD_PARTY_API_BASE_URL = os.getenv("THIRD_PARTY_API_BASE_URL", "http://localhost:8000/mock-api")
 THIRD_PARTY_API_KEY = os.getenv("THIRD_PARTY_API_KEY", "FinPro-Secret-Key")
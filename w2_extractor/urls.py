@@ -2,16 +2,24 @@
 URL configuration for w2_extractor project.
 """
 
+from django.conf import settings
 from django.urls import include, path
+from django.views.decorators.cache import cache_page
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
 
+schema_view = SpectacularAPIView.as_view()
+if not settings.DEBUG:
+    # the schema only changes on deploy, so don't regenerate it per docs page
+    # load; in DEBUG it's left live so view edits show up after a reload
+    schema_view = cache_page(60 * 60)(schema_view)
+
 urlpatterns = [
     # API Documentation
-    path("schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("schema/", schema_view, name="schema"),
     path("docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path("redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
     